@@ -0,0 +1,309 @@
+"""Offline retrieval evaluation.
+
+Runs a labelled set of queries against the ``VectorStoreOperations`` index
+and the retriever ``RetrievalAgent`` wraps, for a grid of retrieval
+configurations, and reports recall@k, MRR, query latency, index build time and
+index memory as JSON.
+
+Usage:
+    uv run python -m agent.evaluation --queries eval_queries.json \\
+        --chunk-sizes 0 1000 --k 1 3 5 --quantization none int8
+
+The queries file is a JSON list of objects with a ``query`` and the list of
+expected ``sources``, given relative to ``demo-source-code``:
+
+    [{"query": "How is position size computed?", "sources": ["risk_manager.py"]}]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import itertools
+import json
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from agent.config import SOURCE_CODE
+from agent.rag import VectorStoreOperations
+
+# Bytes stored per embedding component for each quantization mode
+QUANTIZATION_BYTES = {"none": 4, "float16": 2, "int8": 1}
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic local stand-in for the Mistral embedding model.
+
+    Tokens (identifiers split on snake_case and camelCase) are hashed into a
+    fixed number of signed buckets, so texts sharing vocabulary end up close
+    together without any network access.
+    """
+
+    def __init__(self, dimensions: int = 1024, quantization: str = "none") -> None:
+        if quantization not in QUANTIZATION_BYTES:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.dimensions = dimensions
+        self.quantization = quantization
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in _tokenize(text):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return self._quantize(vector).tolist()
+
+    def _quantize(self, vector: np.ndarray) -> np.ndarray:
+        # Round-trip through the stored precision so scores reflect its loss
+        if self.quantization == "float16":
+            return vector.astype(np.float16).astype(np.float32)
+        if self.quantization == "int8":
+            scale = float(np.abs(vector).max()) / 127 or 1.0
+            return np.round(vector / scale).astype(np.int8).astype(np.float32) * scale
+        return vector
+
+
+@dataclass(frozen=True)
+class RetrievalConfig:
+    chunk_size: int  # characters per chunk, 0 keeps whole files
+    k: int
+    quantization: str = "none"
+
+    @property
+    def name(self) -> str:
+        return f"chunk={self.chunk_size},k={self.k},quant={self.quantization}"
+
+
+@dataclass(frozen=True)
+class LabelledQuery:
+    query: str
+    sources: List[str]
+
+
+def _tokenize(text: str) -> List[str]:
+    words = re.findall(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z0-9]+|[A-Z]+", text)
+    return [word.lower() for word in words if len(word) > 1]
+
+
+def load_labelled_queries(path: Path) -> List[LabelledQuery]:
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    if not isinstance(raw, list):
+        raise ValueError(f"{path}: expected a JSON list of labelled queries")
+
+    queries = []
+    for index, item in enumerate(raw):
+        if not isinstance(item, dict):
+            raise ValueError(f"{path}: entry {index} is not an object: {item!r}")
+        query = item.get("query")
+        sources = item.get("sources")
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError(f"{path}: entry {index} has no 'query': {item!r}")
+        if (
+            not isinstance(sources, list)
+            or not sources
+            or not all(isinstance(source, str) for source in sources)
+        ):
+            raise ValueError(
+                f"{path}: entry {index} needs a non-empty 'sources' list: {item!r}"
+            )
+        queries.append(LabelledQuery(query=query, sources=sources))
+    return queries
+
+
+def chunk_documents(documents: List[Document], chunk_size: int) -> List[Document]:
+    """Split documents on line boundaries into chunks of about chunk_size."""
+    if chunk_size <= 0:
+        return documents
+    chunks = []
+    for doc in documents:
+        current = ""
+        for line in doc.page_content.splitlines(keepends=True):
+            if current and len(current) + len(line) > chunk_size:
+                chunks.append(Document(page_content=current, metadata=doc.metadata))
+                current = ""
+            current += line
+        if current:
+            chunks.append(Document(page_content=current, metadata=doc.metadata))
+    return chunks
+
+
+def _relative_source(doc: Document) -> str:
+    source = Path(doc.metadata.get("source", ""))
+    try:
+        return source.relative_to(SOURCE_CODE).as_posix()
+    except ValueError:
+        return source.as_posix()
+
+
+def _percentile(values: Sequence[float], percent: float) -> float:
+    return float(np.percentile(values, percent)) if values else 0.0
+
+
+def _build_store(
+    chunks: List[Document], config: RetrievalConfig, dimensions: int
+) -> VectorStoreOperations:
+    op = VectorStoreOperations(
+        user_id="evaluation",
+        embeddings=HashingEmbeddings(dimensions, config.quantization),
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        op.add_documents(chunks)
+    return op
+
+
+def evaluate_config(
+    config: RetrievalConfig,
+    documents: List[Document],
+    queries: List[LabelledQuery],
+    dimensions: int = 1024,
+) -> Dict[str, object]:
+    chunks = chunk_documents(documents, config.chunk_size)
+
+    # Time an untraced build; tracemalloc slows every allocation down
+    start = time.perf_counter()
+    op = _build_store(chunks, config, dimensions)
+    build_seconds = time.perf_counter() - start
+
+    # Measure memory on a separate, traced build of the same index
+    tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    traced_op = _build_store(chunks, config, dimensions)
+    index_memory = tracemalloc.get_traced_memory()[0] - memory_before
+    tracemalloc.stop()
+    del traced_op
+
+    # Same retriever app.py hands to RetrievalAgent, invoked directly because
+    # RetrievalAgent.retrieve turns any error into an empty (missed) result
+    retriever = op.vector_store.as_retriever(search_kwargs={"k": config.k})
+
+    # Untimed warm-up so the first config in the grid doesn't absorb the
+    # process's cold-start cost
+    for item in queries:
+        retriever.invoke(item.query)
+
+    recalls, reciprocal_ranks, latencies_ms = [], [], []
+    for item in queries:
+        start = time.perf_counter()
+        docs = retriever.invoke(item.query)
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+
+        expected = set(item.sources)
+        retrieved = [_relative_source(doc) for doc in docs]
+        recalls.append(len(expected.intersection(retrieved)) / len(expected))
+        rank = next((i for i, s in enumerate(retrieved, 1) if s in expected), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    return {
+        "config": asdict(config),
+        "chunks": len(chunks),
+        f"recall@{config.k}": round(statistics.fmean(recalls), 4),
+        "mrr": round(statistics.fmean(reciprocal_ranks), 4),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies_ms), 3),
+            "p50": round(_percentile(latencies_ms, 50), 3),
+            "p90": round(_percentile(latencies_ms, 90), 3),
+            "p99": round(_percentile(latencies_ms, 99), 3),
+            "max": round(max(latencies_ms), 3),
+        },
+        "build_seconds": round(build_seconds, 4),
+        "index_memory_bytes": index_memory,
+        "vector_bytes": len(chunks)
+        * dimensions
+        * QUANTIZATION_BYTES[config.quantization],
+    }
+
+
+def run_evaluation(
+    configs: List[RetrievalConfig],
+    queries: List[LabelledQuery],
+    dimensions: int = 1024,
+) -> Dict[str, object]:
+    if not queries:
+        raise ValueError("No labelled queries to evaluate")
+    op = VectorStoreOperations(
+        user_id="evaluation", embeddings=HashingEmbeddings(dimensions)
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        documents = op.load_code_and_readme_files()
+    if not documents:
+        raise ValueError(f"No .py or .md documents found in {SOURCE_CODE}")
+    documents.sort(key=_relative_source)
+
+    known_sources = {_relative_source(doc) for doc in documents}
+    for item in queries:
+        missing = sorted(set(item.sources) - known_sources)
+        if missing:
+            raise ValueError(
+                f"Query {item.query!r} expects sources not in {SOURCE_CODE}: "
+                f"{', '.join(missing)}"
+            )
+    return {
+        "queries": len(queries),
+        "documents": len(documents),
+        "dimensions": dimensions,
+        "results": {
+            config.name: evaluate_config(config, documents, queries, dimensions)
+            for config in configs
+        },
+    }
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure retrieval quality and latency over demo-source-code."
+    )
+    parser.add_argument("--queries", type=Path, required=True)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[0])
+    parser.add_argument("--k", type=int, nargs="+", default=[1])
+    parser.add_argument(
+        "--quantization",
+        nargs="+",
+        default=["none"],
+        choices=sorted(QUANTIZATION_BYTES),
+    )
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args(argv)
+    if any(k < 1 for k in args.k):
+        parser.error("--k values must be at least 1")
+    if any(chunk_size < 0 for chunk_size in args.chunk_sizes):
+        parser.error("--chunk-sizes values must be 0 (whole files) or positive")
+
+    configs = [
+        RetrievalConfig(chunk_size=chunk_size, k=k, quantization=quantization)
+        for chunk_size, k, quantization in itertools.product(
+            args.chunk_sizes, args.k, args.quantization
+        )
+    ]
+    report = run_evaluation(
+        configs, load_labelled_queries(args.queries), args.dimensions
+    )
+    output = json.dumps(report, indent=2, sort_keys=True) + "\n"
+    if args.output:
+        args.output.write_text(output, encoding="utf-8")
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == "__main__":
+    main()
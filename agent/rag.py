@@ -2,6 +2,7 @@ import os
 from typing import List, Optional
 from langchain_mistralai import MistralAIEmbeddings
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import InMemoryVectorStore
 from pathlib import Path
 from agent.config import EMBEDDING_MODEL, SOURCE_CODE
@@ -14,9 +15,9 @@ HF_TOKEN = os.environ.get("HF_TOKEN")
 
 
 class VectorStoreOperations:
-    def __init__(self, user_id: str) -> None:
+    def __init__(self, user_id: str, embeddings: Optional[Embeddings] = None) -> None:
         self.user_id = user_id
-        self.embeddings = MistralAIEmbeddings(model=EMBEDDING_MODEL)
+        self.embeddings = embeddings or MistralAIEmbeddings(model=EMBEDDING_MODEL)
         self.vector_store = InMemoryVectorStore(embedding=self.embeddings)
 
     def load_code_and_readme_files(self) -> List[Document]: